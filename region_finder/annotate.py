@@ -0,0 +1,381 @@
+import os
+import sys
+import gzip
+import shutil
+import argparse
+import tempfile
+from itertools import groupby
+from multiprocessing import Pool
+from operator import itemgetter
+from .bed_parser import BedFormatError
+from .region_iter import parse_region
+
+ANNOTATION_COLUMNS = ['OVERLAP', 'N_OVERLAPS', 'OVERLAP_NAMES']
+VCF_INFO_HEADERS = [
+    '##INFO=<ID=OVERLAP,Number=1,Type=Integer,Description="1 if the ' +
+    'record overlaps any target interval, otherwise 0">\n',
+    '##INFO=<ID=N_OVERLAPS,Number=1,Type=Integer,Description="Number of ' +
+    'target intervals overlapping the record">\n',
+    '##INFO=<ID=OVERLAP_NAMES,Number=.,Type=String,Description="Unique ' +
+    'names of target intervals overlapping the record">\n']
+
+
+def annotate(query, target, output=sys.stdout, query_format=None,
+             processes=1):
+    '''
+        Stream records from a query file against the intervals of a
+        target BED file and write each query record with three extra
+        columns: whether it overlaps any target interval (1 or 0), the
+        number of overlapping target intervals and the unique names
+        (4th column) of overlapping target intervals ('.' if none).
+        For VCF queries these are instead added to the INFO field of
+        each record as OVERLAP, N_OVERLAPS and OVERLAP_NAMES, with
+        matching INFO header lines, so that the output remains VCF.
+
+        Both files must be sorted by start coordinate within each
+        contig, but contigs need not be in the same order. Only target
+        intervals overlapping the current query record are held in
+        memory. Gzipped files are decompressed once to a temporary file
+        so that contigs can be read in any order without repeatedly
+        decompressing the file.
+
+        Args:
+            query:  BED, VCF or region list (one 'chr1:1000-2000' per
+                    line) filename, optionally gzipped. '-' reads from
+                    STDIN.
+
+            target: BED filename, optionally gzipped.
+
+            output: file handle to write to.
+
+            query_format:
+                    one of 'bed', 'vcf' or 'regions'. By default VCF is
+                    assumed if query ends with '.vcf' or '.vcf.gz' and
+                    BED otherwise.
+
+            processes:
+                    If greater than 1, contigs are annotated in a pool
+                    of this many processes. Output order is the same
+                    as for a single process.
+    '''
+    if query_format is None:
+        query_format = _guess_format(query)
+    if processes > 1 and query == '-':
+        raise ValueError("Query must be a file to use multiple processes")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        target, target_offsets = _index_contigs(target, _parse_bed, tmpdir)
+        if processes > 1:
+            _annotate_parallel(query, target, target_offsets, query_format,
+                               output, processes, tmpdir)
+        elif query == '-':
+            _annotate_serial(sys.stdin, target, target_offsets,
+                             query_format, output)
+        else:
+            with _open(query) as fh:
+                _annotate_serial(_decoded(fh), target, target_offsets,
+                                 query_format, output)
+
+
+def _annotate_serial(lines, target, target_offsets, query_format, output):
+    parse = _QUERY_PARSERS[query_format]
+    with open(target, 'rb') as tfh:
+        for contig, block in groupby(_records(lines, parse), itemgetter(1)):
+            if contig is None:  # header lines
+                for record in block:
+                    output.write(_header(record[0], query_format))
+                continue
+            _annotate_block(block, tfh, target_offsets.get(contig),
+                            query_format, output)
+
+
+def _annotate_parallel(query, target, target_offsets, query_format, output,
+                       processes, tmpdir):
+    '''
+        Annotate each contig of the query in a separate task. Workers
+        seek to their contig in (uncompressed copies of) the query and
+        target files, so neither file is read more than once in full.
+    '''
+    parse = _QUERY_PARSERS[query_format]
+    query, query_offsets = _index_contigs(query, parse, tmpdir)
+    with open(query, 'rb') as fh:
+        for line in _decoded(fh):
+            if parse(line) is not None:
+                break
+            output.write(_header(line, query_format))
+    args = ((query, target, query_format, query_offsets[c],
+             target_offsets.get(c), os.path.join(tmpdir, "{}.out".format(i)))
+            for i, c in enumerate(query_offsets))
+    with Pool(processes) as pool:
+        for result in pool.imap(_annotate_contig, args):
+            with open(result, 'rt') as fh:
+                shutil.copyfileobj(fh, output)
+            os.remove(result)
+
+
+def _annotate_contig(args):
+    ''' Annotate a single contig of a query file, writing to out_path. '''
+    query, target, query_format, query_offset, target_offset, out_path = args
+    with open(query, 'rb') as qfh, open(target, 'rb') as tfh, \
+            open(out_path, 'wt') as out:
+        qfh.seek(query_offset)
+        records = _records(_decoded(qfh), _QUERY_PARSERS[query_format])
+        contig, block = next(groupby(records, itemgetter(1)))
+        _annotate_block(block, tfh, target_offset, query_format, out)
+    return out_path
+
+
+def _annotate_block(records, target_fh, target_offset, query_format,
+                    output):
+    '''
+        Sweep through sorted records from a single contig and the target
+        intervals of the same contig, which start at target_offset of
+        target_fh (None if the contig is not in the target file).
+    '''
+    annotated = _vcf_annotated if query_format == 'vcf' else _annotated
+    targets = iter(())
+    if target_offset is not None:
+        target_fh.seek(target_offset)
+        targets = _target_intervals(target_fh)
+    pending = next(targets, None)
+    active = []
+    prev_start = -1
+    for line, contig, start, end in records:
+        if start is None:  # comment line
+            output.write(line)
+            continue
+        if start < prev_start:
+            raise SortOrderError("Query records are not sorted - {}:{} "
+                                 .format(contig, start + 1) +
+                                 "follows {}:{}".format(contig,
+                                                        prev_start + 1))
+        prev_start = start
+        while pending is not None and pending[0] < end:
+            active.append(pending)
+            pending = next(targets, None)
+        active = [t for t in active if t[1] > start]
+        names = []
+        n_hits = 0
+        for t in active:
+            if t[0] < end:
+                n_hits += 1
+                if t[2] not in names:
+                    names.append(t[2])
+        output.write(annotated(line.rstrip("\r\n"), n_hits, names))
+
+
+def _annotated(line, n_hits, names):
+    ''' Add annotations to line as extra columns. '''
+    return "\t".join([line, str(int(n_hits > 0)), str(n_hits),
+                      ",".join(names) or "."]) + "\n"
+
+
+def _vcf_annotated(line, n_hits, names):
+    ''' Add annotations to the INFO field of a VCF record. '''
+    s = line.split("\t")
+    if len(s) < 8:
+        raise ValueError("Not enough fields in VCF line: " + line)
+    info = ["OVERLAP={}".format(int(n_hits > 0)),
+            "N_OVERLAPS={}".format(n_hits)]
+    if names:
+        info.append("OVERLAP_NAMES=" + ",".join(_vcf_escape(x)
+                                                for x in names))
+    if s[7] not in ('', '.'):
+        info.insert(0, s[7])
+    s[7] = ";".join(info)
+    return "\t".join(s) + "\n"
+
+
+def _vcf_escape(value):
+    ''' Percent-encode characters with special meaning in INFO fields. '''
+    for char in '%:;=, \t':
+        value = value.replace(char, "%{:02X}".format(ord(char)))
+    return value
+
+
+def _target_intervals(fh):
+    ''' Yield (start, end, name) from fh until the contig changes. '''
+    contig = None
+    prev_start = -1
+    for line in _decoded(fh):
+        interval = _parse_bed(line)
+        if interval is None:
+            continue
+        if contig is None:
+            contig = interval[0]
+        elif interval[0] != contig:
+            return
+        if interval[1] < prev_start:
+            raise SortOrderError("Target intervals are not sorted - " +
+                                 "{}:{} follows {}:{}".format(
+                                     contig, interval[1] + 1, contig,
+                                     prev_start + 1))
+        prev_start = interval[1]
+        s = line.rstrip("\r\n").split("\t", 4)
+        yield (interval[1], interval[2], s[3] if len(s) > 3 else '.')
+
+
+def _records(lines, parse):
+    '''
+        Yield (line, contig, start, end) for each line. Header lines
+        preceding the first record have a contig of None, while other
+        comment lines have the contig of the preceding record and a
+        start of None.
+    '''
+    contig = None
+    for line in lines:
+        interval = parse(line)
+        if interval is None:
+            yield (line, contig, None, None)
+        else:
+            contig = interval[0]
+            yield (line, contig, interval[1], interval[2])
+
+
+def _index_contigs(path, parse, tmpdir):
+    '''
+        Return the path of an uncompressed copy of path (path itself if
+        not compressed) and a dict of contig names to the file offset of
+        their first record, checking that each contig occupies a single
+        block. Compressed files are decompressed to tmpdir as they are
+        read, so that later seeks do not have to decompress the file
+        from the start again.
+    '''
+    offsets = dict()
+    prev_contig = None
+    offset = 0
+    copy = None
+    out = None
+    if path.endswith((".gz", ".bgz")):
+        fd, copy = tempfile.mkstemp(suffix='.txt', dir=tmpdir)
+        out = os.fdopen(fd, 'wb')
+    try:
+        with _open(path) as fh:
+            for line in iter(fh.readline, b''):
+                if out is not None:
+                    out.write(line)
+                line_offset = offset
+                offset += len(line)
+                interval = parse(line.decode(errors='replace'))
+                if interval is None or interval[0] == prev_contig:
+                    continue
+                prev_contig = interval[0]
+                if prev_contig in offsets:
+                    raise SortOrderError("Records for contig '{}' are not "
+                                         .format(prev_contig) +
+                                         "contiguous in " + path)
+                offsets[prev_contig] = line_offset
+    finally:
+        if out is not None:
+            out.close()
+    return copy or path, offsets
+
+
+def _parse_bed(line):
+    if line[0] == '#' or line.startswith(('track', 'browser')) or \
+            not line.strip():
+        return None
+    s = line.split("\t", 3)
+    if len(s) < 3:
+        raise BedFormatError("Not enough fields in BED line: " + line)
+    try:
+        return (s[0], int(s[1]), int(s[2]))
+    except ValueError:
+        raise BedFormatError("Columns 2 and 3 must be integers (for " +
+                             "line: " + line + ")")
+
+
+def _parse_vcf(line):
+    if line[0] == '#' or not line.strip():
+        return None
+    s = line.split("\t", 4)
+    if len(s) < 4:
+        raise ValueError("Not enough fields in VCF line: " + line)
+    start = int(s[1]) - 1
+    return (s[0], start, start + len(s[3]))
+
+
+def _parse_region(line):
+    region = line.strip()
+    if not region or region[0] == '#':
+        return None
+    return parse_region(region)
+
+
+_QUERY_PARSERS = dict(bed=_parse_bed, vcf=_parse_vcf, regions=_parse_region)
+
+
+def _header(line, query_format):
+    if not line.startswith('#CHROM'):
+        return line
+    if query_format == 'vcf':
+        return "".join(VCF_INFO_HEADERS) + line
+    return "\t".join([line.rstrip("\r\n")] + ANNOTATION_COLUMNS) + "\n"
+
+
+def _guess_format(path):
+    if path.endswith(('.vcf', '.vcf.gz', '.vcf.bgz')):
+        return 'vcf'
+    return 'bed'
+
+
+def _open(path):
+    ''' Open in binary mode, decompressing gzipped files. '''
+    if path.endswith((".gz", ".bgz")):
+        return gzip.open(path, mode='rb')
+    return open(path, 'rb')
+
+
+def _decoded(fh):
+    for line in iter(fh.readline, b''):
+        yield line.decode(errors='replace')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Annotate records from a sorted BED, VCF or region ' +
+        'list with overlapping intervals from a sorted BED file. Three ' +
+        'columns (OVERLAP, N_OVERLAPS and OVERLAP_NAMES) are added to ' +
+        'BED and region list records, while VCF records are annotated ' +
+        'with INFO fields of the same names.')
+    parser.add_argument('query',
+                        help='BED, VCF or region list to annotate. Use ' +
+                        '"-" to read from STDIN.')
+    parser.add_argument('target', help='BED file of intervals to annotate ' +
+                        'query records with.')
+    parser.add_argument('-f', '--format', choices=sorted(_QUERY_PARSERS),
+                        help='Format of query file. Default is to assume ' +
+                        'VCF if query ends with ".vcf" or ".vcf.gz" and ' +
+                        'BED otherwise.')
+    parser.add_argument('-o', '--output', help='Output filename. Default ' +
+                        'is STDOUT.')
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help='Number of processes to use. Contigs are ' +
+                        'annotated in parallel if greater than 1. Query ' +
+                        'must be a file rather than STDIN to use more ' +
+                        'than one process. Default=1.')
+    args = parser.parse_args(argv)
+    if args.processes > 1 and args.query == '-':
+        parser.error("Query must be a file rather than STDIN to use more " +
+                     "than one process")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = sys.stdout
+    if args.output is not None:
+        output = open(args.output, 'wt')
+    try:
+        annotate(args.query, args.target, output=output,
+                 query_format=args.format, processes=args.processes)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+class SortOrderError(ValueError):
+    pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import numpy as np
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+
+class BitmapIndex(object):
+    '''
+    From an IntervalIter object create a per-contig packed bit array of
+    covered positions, providing constant time membership queries for
+    single positions and popcount based coverage of ranges.
+    '''
+
+    __slots__ = ['bitmaps', 'runs']
+
+    def __init__(self, interval_iter, compress=False):
+        '''
+        Args:
+
+            interval_iter:
+                An IntervalIter, BedParser or RegionIter object. Its
+                merged intervals are used to build the index.
+
+            compress:
+                If True, contigs for which storing the start and end
+                coordinates of covered runs takes less memory than a
+                bit array (i.e. sparsely covered contigs) are stored
+                run-length encoded instead. Queries on these contigs
+                require a binary search rather than a single lookup.
+        '''
+        self.bitmaps = dict()
+        self.runs = dict()
+        per_contig = dict()
+        for gi in interval_iter.intervals:
+            if gi.contig not in per_contig:
+                per_contig[gi.contig] = ([], [])
+            per_contig[gi.contig][0].append(gi.start)
+            per_contig[gi.contig][1].append(gi.end)
+        for contig, (starts, ends) in per_contig.items():
+            starts = np.array(starts, dtype=np.int64)
+            ends = np.array(ends, dtype=np.int64)
+            length = ends.max()
+            if compress and len(starts) * 24 < (length + 7) // 8:
+                cumulative = np.zeros(len(starts) + 1, dtype=np.int64)
+                np.cumsum(ends - starts, out=cumulative[1:])
+                self.runs[contig] = (starts, ends, cumulative)
+            else:
+                bits = np.zeros((length + 7) // 8, dtype=np.uint8)
+                for s, e in zip(starts.tolist(), ends.tolist()):
+                    _set_bits(bits, s, e)
+                self.bitmaps[contig] = bits
+
+    def contains(self, contig, pos):
+        '''
+        Returns True if the given position lies within an interval.
+
+        Args:
+            contig: contig/chromosome name
+
+            pos:    1-based position
+
+        '''
+        p = pos - 1
+        bits = self.bitmaps.get(contig)
+        if bits is not None:
+            if p < 0 or p >> 3 >= len(bits):
+                return False
+            return bool(bits[p >> 3] >> (7 - (p & 7)) & 1)
+        if contig not in self.runs:
+            return False
+        starts, ends, _ = self.runs[contig]
+        i = starts.searchsorted(p, side='right') - 1
+        return bool(i >= 0 and p < ends[i])
+
+    def contains_positions(self, contig, positions):
+        '''
+        Returns a boolean numpy array indicating whether each position
+        lies within an interval.
+
+        Args:
+            contig:     contig/chromosome name
+
+            positions:  array-like of 1-based positions
+
+        '''
+        p = np.asarray(positions, dtype=np.int64) - 1
+        bits = self.bitmaps.get(contig)
+        if bits is not None:
+            valid = (p >= 0) & (p < len(bits) * 8)
+            result = np.zeros(len(p), dtype=bool)
+            q = p[valid]
+            result[valid] = (bits[q >> 3] >> (7 - (q & 7))) & 1
+            return result
+        if contig not in self.runs:
+            return np.zeros(len(p), dtype=bool)
+        starts, ends, _ = self.runs[contig]
+        i = starts.searchsorted(p, side='right') - 1
+        return (i >= 0) & (p < ends[np.maximum(i, 0)])
+
+    def covered_bases(self, contig, start, end):
+        '''
+        Returns the number of positions between start and end that lie
+        within an interval.
+
+        Args:
+            contig: contig/chromosome name
+
+            start:  1-based start coordinate of region
+
+            end:    1-based end coordinate of region
+
+        '''
+        bits = self.bitmaps.get(contig)
+        if bits is not None:
+            s = max(start - 1, 0)
+            e = min(end, len(bits) * 8)
+            if s >= e:
+                return 0
+            first, last = s >> 3, (e - 1) >> 3
+            total = _POPCOUNT[bits[first:last + 1]].sum()
+            # exclude bits preceding s and following e - 1
+            head_mask = ~(0xFF >> (s & 7)) & 0xFF
+            tail_mask = 0xFF >> (((e - 1) & 7) + 1)
+            total -= _POPCOUNT[int(bits[first]) & head_mask]
+            total -= _POPCOUNT[int(bits[last]) & tail_mask]
+            return int(total)
+        if contig not in self.runs or start > end:
+            return 0
+        return (self._run_coverage_before(contig, end) -
+                self._run_coverage_before(contig, start - 1))
+
+    def _run_coverage_before(self, contig, pos):
+        ''' Number of covered 0-based positions less than pos. '''
+        starts, ends, cumulative = self.runs[contig]
+        i = starts.searchsorted(pos, side='left')
+        if i == 0:
+            return 0
+        return int(cumulative[i] - max(0, ends[i - 1] - pos))
+
+
+def _set_bits(bits, start, end):
+    '''
+        Set bits for 0-based positions start to end - 1 in a packed
+        (big-endian, as for numpy.packbits) bit array.
+    '''
+    first, last = start >> 3, (end - 1) >> 3
+    head_mask = 0xFF >> (start & 7)
+    tail_mask = ~(0xFF >> (((end - 1) & 7) + 1)) & 0xFF
+    if first == last:
+        bits[first] |= head_mask & tail_mask
+    else:
+        bits[first] |= head_mask
+        bits[first + 1:last] = 0xFF
+        bits[last] |= tail_mask
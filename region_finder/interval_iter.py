@@ -1,4 +1,4 @@
-import operator
+import numpy as np
 from natsort import natsorted
 from .genomic_interval import GenomicInterval
 
@@ -12,6 +12,12 @@ class IntervalIter(object):
     __slots__ = ['intervals', 'next_index']
 
     def __init__(self, intervals):
+        '''
+        Args:
+            intervals:
+                An iterable of lists where the first three columns
+                are contig, start (0-based) and end.
+        '''
         self.next_index = 0
         self.intervals = self._merge_regions(intervals)
 
@@ -48,22 +54,35 @@ class IntervalIter(object):
         self.next_index = value + 1
 
     def _merge_regions(self, regions):
-        ''' Return a list of merged regions as GenomicInterval objects.'''
-        if self._sort_needed(regions):
-            regions = natsorted(regions, key=operator.itemgetter(0, 1, 2))
-        genomic_intervals = []
-        prev_i = None
+        '''
+            Return a list of merged regions as GenomicInterval objects.
+            Regions are partitioned by contig and the coordinates of
+            each contig are sorted and merged as numpy arrays.
+        '''
+        sort_needed = self._sort_needed(regions)
+        per_contig = dict()
         for r in regions:
-            gi = GenomicInterval(r)
-            if prev_i is None:
-                prev_i = gi
-            elif prev_i.overlaps(gi):
-                prev_i.merge_interval(gi)
-            else:
-                genomic_intervals.append(prev_i)
-                prev_i = gi
-        if prev_i is not None:
-            genomic_intervals.append(prev_i)
+            if r[0] not in per_contig:
+                per_contig[r[0]] = []
+            per_contig[r[0]].append(r)
+        contigs = list(per_contig)
+        if sort_needed:
+            contigs = natsorted(contigs)
+        genomic_intervals = []
+        for c in contigs:
+            rows = per_contig[c]
+            starts = np.array([r[1] for r in rows], dtype=np.int64)
+            ends = np.array([r[2] for r in rows], dtype=np.int64)
+            invalid = np.flatnonzero(starts >= ends)
+            if len(invalid):
+                GenomicInterval(rows[invalid[0]])  # raises error
+            order, group_starts, group_ends = _merge_contig_coords(starts,
+                                                                   ends)
+            rows = [rows[i] for i in order.tolist()]
+            bounds = group_starts.tolist() + [len(rows)]
+            for i, end in enumerate(group_ends.tolist()):
+                genomic_intervals.append(_merged_interval(rows, bounds[i],
+                                                          bounds[i + 1], end))
         return genomic_intervals
 
     def _sort_needed(self, regions):
@@ -81,3 +100,62 @@ class IntervalIter(object):
                     return True
             prev = r
         return False
+
+
+def merge_sorted_regions(regions):
+    '''
+        Return a list of merged GenomicInterval objects from an iterable
+        of regions which must already be sorted in coordinate order.
+        Merged intervals are found in a single pass using the running
+        maximum end coordinate and are created from slices of regions.
+    '''
+    if not isinstance(regions, list):
+        regions = list(regions)
+    genomic_intervals = []
+    first = 0
+    contig = end = None
+    for i, r in enumerate(regions):
+        start, r_end = int(r[1]), int(r[2])
+        if start >= r_end:
+            GenomicInterval(r)  # raises error
+        if r[0] == contig and start < end:
+            if r_end > end:
+                end = r_end
+            continue
+        if contig is not None:
+            genomic_intervals.append(_merged_interval(regions, first, i, end))
+        contig, end, first = r[0], r_end, i
+    if contig is not None:
+        genomic_intervals.append(_merged_interval(regions, first,
+                                                  len(regions), end))
+    return genomic_intervals
+
+
+def _merged_interval(rows, first, last, end):
+    '''
+        Create a GenomicInterval from sorted overlapping rows first to
+        last - 1, which end at end.
+    '''
+    gi = GenomicInterval(rows[first])
+    if last - first > 1:
+        gi.end = end
+        gi.regions = rows[first:last]
+    return gi
+
+
+def _merge_contig_coords(starts, ends):
+    '''
+        For start and end coordinates of intervals from a single contig,
+        return the coordinate sort order of the intervals, the indices
+        (in sorted order) at which each merged interval begins and the
+        end coordinate of each merged interval.
+    '''
+    order = np.lexsort((ends, starts))
+    starts = starts[order]
+    max_ends = np.maximum.accumulate(ends[order])
+    # a new merged interval begins wherever an interval starts at or
+    # after the end of all preceding intervals
+    group_starts = np.flatnonzero(starts[1:] >= max_ends[:-1]) + 1
+    group_starts = np.concatenate(([0], group_starts))
+    group_ends = max_ends[np.append(group_starts[1:] - 1, len(order) - 1)]
+    return order, group_starts, group_ends
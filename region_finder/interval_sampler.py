@@ -3,6 +3,7 @@ import bisect
 import numpy as np
 from random import randint
 from .genomic_interval import GenomicInterval
+from .shared_index import SharedIndex
 
 
 class IntervalSampler(object):
@@ -19,6 +20,15 @@ class IntervalSampler(object):
     def __len__(self):
         return self.length
 
+    def to_shared_index(self, name=None):
+        '''
+        Copy intervals and linear index into a new shared memory block
+        which can be attached to, read-only, by other processes. The
+        resulting SharedIndex provides the interval_by_index and
+        position_by_index methods of this class.
+        '''
+        return SharedIndex.create(self.intervals, name=name)
+
     def interval_by_index(self, i):
         if i >= self.length:
             return None
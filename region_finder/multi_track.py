@@ -0,0 +1,117 @@
+import os
+import numpy as np
+from .bed_parser import BedParser
+from .nclist import NCList
+from .region_iter import parse_region, parse_regions
+
+
+class MultiTrackFinder(object):
+    '''
+        From several BED files or IntervalIter objects (tracks), create
+        one index of the merged intervals of every track, tagged with
+        the track they came from. A single search retrieves overlapping
+        intervals from all tracks, grouped by track. Intervals of each
+        contig are held in a nested containment list (NCList), so long
+        intervals in one track do not slow searches of the others.
+    '''
+
+    __slots__ = ['tracks', 'contigs']
+
+    def __init__(self, tracks, names=None):
+        '''
+        Args:
+
+            tracks:
+                A list of BED filenames and/or IntervalIter (e.g.
+                BedParser or RegionIter) objects.
+
+            names:
+                Optional list of names for each track. By default BED
+                files are named by their filename and other tracks are
+                named 'track_<n>' where n is the index of the track.
+        '''
+        if names is None:
+            names = [os.path.basename(x) if isinstance(x, str) else
+                     'track_{}'.format(i) for i, x in enumerate(tracks)]
+        if len(names) != len(tracks):
+            raise ValueError("Number of names ({}) does not match ".format(
+                len(names)) + "number of tracks ({})".format(len(tracks)))
+        if len(set(names)) != len(names):
+            raise ValueError("Track names must be unique")
+        self.tracks = list(names)
+        per_contig = dict()
+        for i, track in enumerate(tracks):
+            if isinstance(track, str):
+                track = BedParser(track)
+            for gi in track.intervals:
+                if gi.contig not in per_contig:
+                    per_contig[gi.contig] = []
+                per_contig[gi.contig].append((gi.start, i, gi))
+        self.contigs = dict()
+        for contig, intervals in per_contig.items():
+            intervals.sort(key=lambda x: x[:2])
+            self.contigs[contig] = (
+                NCList([x[2].start for x in intervals],
+                       [x[2].end for x in intervals]),
+                np.array([x[1] for x in intervals], dtype=np.int32),
+                [x[2] for x in intervals])
+
+    def fetch_by_interval(self, interval):
+        '''
+        Args:
+            interval:    region in format "chr1:1000-5000"
+
+        '''
+        contig, start, end = parse_region(interval)
+        return self.fetch(contig, start + 1, end)
+
+    def fetch_by_intervals(self, intervals):
+        '''
+        Args:
+            intervals:  list of regions in format "chr1:1000-5000"
+
+        '''
+        contigs, starts, ends = parse_regions(intervals)
+        return self.fetch_many(zip(contigs.tolist(), (starts + 1).tolist(),
+                                   ends.tolist()))
+
+    def fetch(self, contig, start, end):
+        '''
+        Returns a dict of track names to lists of overlapping
+        GenomicInterval objects. Tracks without overlapping intervals
+        are not included.
+
+        Args:
+            contig: contig/chromosome name
+
+            start:  1-based start coordinate of region
+
+            end:    1-based end coordinate of region
+
+        '''
+        return self._fetch(contig, start, end)
+
+    def fetch_many(self, queries):
+        '''
+        Search several regions at once. Returns a list of results (as
+        for the fetch method) for each query.
+
+        Args:
+            queries:    iterable of (contig, start, end) tuples, using
+                        1-based start and end coordinates.
+
+        '''
+        return [self._fetch(*q) for q in queries]
+
+    def _fetch(self, contig, start, end):
+        if contig not in self.contigs:
+            return dict()
+        nclist, track_ids, intervals = self.contigs[contig]
+        hits = nclist.find(start, end)
+        result = dict()
+        for j in hits[np.argsort(track_ids[hits], kind='stable')].tolist():
+            track = self.tracks[track_ids[j]]
+            if track not in result:
+                result[track] = []
+            result[track].append(intervals[j])
+        return result
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class NCList(object):
+    '''
+        Nested containment list for a set of intervals from a single
+        contig. Intervals contained within another interval are stored
+        in a sublist belonging to that interval, so that the starts and
+        ends of every sublist are both sorted. Searches therefore take
+        O(log n + hits) time even when long intervals span many others.
+    '''
+
+    __slots__ = ['starts', 'ends', 'ids', 'sub_starts', 'sub_ends',
+                 'n_top']
+
+    def __init__(self, starts, ends):
+        '''
+        Args:
+            starts: array-like of 0-based start coordinates
+
+            ends:   array-like of end coordinates
+
+        '''
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        order = np.lexsort((-ends, starts))
+        sorted_ends = ends[order].tolist()
+        # assign each interval to the sublist of an interval containing it
+        sublists = {-1: []}
+        stack = []
+        for k in range(len(order)):
+            while stack and sorted_ends[stack[-1]] < sorted_ends[k]:
+                stack.pop()
+            parent = stack[-1] if stack else -1
+            if parent not in sublists:
+                sublists[parent] = []
+            sublists[parent].append(k)
+            stack.append(k)
+        # concatenate sublists, top level first, recording their ranges
+        flat = []
+        ranges = dict()
+        for parent, members in sublists.items():
+            ranges[parent] = (len(flat), len(flat) + len(members))
+            flat.extend(members)
+        self.n_top = len(sublists[-1])
+        flat = np.array(flat, dtype=np.int64)
+        self.ids = order[flat]
+        self.starts = starts[self.ids]
+        self.ends = ends[self.ids]
+        self.sub_starts = np.zeros(len(flat), dtype=np.int64)
+        self.sub_ends = np.zeros(len(flat), dtype=np.int64)
+        position = np.empty(len(flat), dtype=np.int64)
+        position[flat] = np.arange(len(flat))
+        for parent, (a, b) in ranges.items():
+            if parent >= 0:
+                self.sub_starts[position[parent]] = a
+                self.sub_ends[position[parent]] = b
+
+    def __len__(self):
+        return len(self.ids)
+
+    def find(self, start, end):
+        '''
+        Return a sorted numpy array of the indices (in the order given
+        on creation) of intervals overlapping the given coordinates,
+        using the same rules as RegionFinder.fetch.
+
+        Args:
+            start:  1-based start coordinate of region
+
+            end:    1-based end coordinate of region
+
+        '''
+        hits = [self.ids[lo:hi] for lo, hi in self.search_ranges(start, end)]
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(hits))
+
+    def search_ranges(self, start, end):
+        '''
+        Yield (lo, hi) ranges of the internal arrays containing
+        overlapping intervals. Every interval in each range overlaps
+        the given coordinates.
+        '''
+        pending = [(0, self.n_top)]
+        while pending:
+            a, b = pending.pop()
+            lo = a + self.ends[a:b].searchsorted(start, side='left')
+            hi = a + self.starts[a:b].searchsorted(end, side='left')
+            if lo >= hi:
+                continue
+            yield lo, hi
+            for j in lo + np.flatnonzero(self.sub_ends[lo:hi]):
+                pending.append((self.sub_starts[j], self.sub_ends[j]))
@@ -1,4 +1,10 @@
+import bisect
 from collections import defaultdict
+from .genomic_interval import GenomicInterval
+from .interval_iter import merge_sorted_regions
+from .nclist import NCList
+from .region_iter import parse_region, parse_regions
+from .shared_index import SharedIndex
 
 
 class RegionFinder(object):
@@ -8,9 +14,10 @@ class RegionFinder(object):
         end coordinates.
     '''
 
-    __slots__ = ['regions', 'window_size']
+    __slots__ = ['regions', 'window_size', 'record_index']
 
-    def __init__(self, interval_iter, window_size=100_000):
+    def __init__(self, interval_iter, window_size=100_000,
+                 record_index=False):
         '''
         Args:
 
@@ -26,16 +33,131 @@ class RegionFinder(object):
                 this length. Fetch actions identify which bin(s) overlap
                 the search coordinates and then perform binary searches
                 on those bins.
+
+            record_index:
+                If True, also index the unmerged intervals (the
+                'regions' property) of each merged interval created from
+                more than one interval, so that fetch_records can find
+                the original intervals overlapping a search using a
+                nested containment list rather than a scan of all of
+                them.
         '''
         self.regions = defaultdict(dict)
         self.window_size = window_size
+        self.record_index = defaultdict(dict) if record_index else None
         for gi in interval_iter:  # these should already be coordinate sorted
-            r_start = int(gi.start / window_size) * window_size
-            r_end = int(gi.end / window_size) * window_size
-            for i in range(r_start, r_end + window_size, window_size):
-                if i not in self.regions[gi.contig]:
-                    self.regions[gi.contig][i] = list()
-                self.regions[gi.contig][i].append(gi)
+            windows = self.regions[gi.contig]
+            for i in _window_range(gi, window_size):
+                if i not in windows:
+                    windows[i] = list()
+                windows[i].append(gi)
+            if self.record_index is not None:
+                self._index_records(gi)
+
+    def add_interval(self, interval):
+        '''
+        Add an interval to the index, merging it with any overlapping
+        intervals already indexed. Only the windows spanned by the
+        merged interval are updated.
+
+        Args:
+            interval:   A list of columns from a BED file (i.e. contig,
+                        0-based start and end followed by any other
+                        columns).
+
+        Returns:
+            The merged GenomicInterval containing the new interval.
+        '''
+        gi = GenomicInterval(interval)
+        for other in self.fetch(gi.contig, gi.start + 1, gi.end):
+            self._remove_from_windows(other)
+            gi.merge_interval(other)
+        self._add_to_windows(gi)
+        return gi
+
+    def remove_interval(self, interval):
+        '''
+        Remove an interval previously added to the index. The merged
+        interval containing it is split if the remaining intervals no
+        longer overlap.
+
+        Args:
+            interval:   A list of columns identical to one of the
+                        unmerged intervals in the 'regions' property of
+                        an indexed GenomicInterval.
+
+        Returns:
+            A list of the merged GenomicIntervals that replace the
+            GenomicInterval the interval was removed from.
+        '''
+        start, end = int(interval[1]), int(interval[2])
+        for gi in self.fetch(interval[0], start + 1, end):
+            if interval in gi.regions:
+                break
+        else:
+            raise IntervalNotFoundError(
+                "Interval {}:{}-{} not found in index".format(
+                    interval[0], start + 1, end))
+        regions = list(gi.regions)
+        regions.remove(interval)
+        self._remove_from_windows(gi)
+        replacements = merge_sorted_regions(regions)
+        for other in replacements:
+            self._add_to_windows(other)
+        return replacements
+
+    def _index_records(self, gi):
+        ''' Store an NCList of the unmerged intervals of gi. '''
+        if len(gi.regions) < 2:
+            return
+        self.record_index[gi.contig][gi.start] = NCList(
+            [r[1] for r in gi.regions], [r[2] for r in gi.regions])
+
+    def _add_to_windows(self, gi):
+        if self.record_index is not None:
+            self._index_records(gi)
+        windows = self.regions[gi.contig]
+        for i in _window_range(gi, self.window_size):
+            if i not in windows:
+                windows[i] = list()
+            bisect.insort(windows[i], gi)
+
+    def _remove_from_windows(self, gi):
+        if self.record_index is not None:
+            self.record_index[gi.contig].pop(gi.start, None)
+        windows = self.regions[gi.contig]
+        for i in _window_range(gi, self.window_size):
+            j = bisect.bisect_left(windows[i], gi)
+            while windows[i][j] is not gi:
+                j += 1
+            del windows[i][j]
+            if not windows[i]:
+                del windows[i]
+        if not windows:
+            del self.regions[gi.contig]
+
+    def to_shared_index(self, name=None):
+        '''
+        Copy the merged intervals of this index into a new shared memory
+        block which can be attached to, read-only, by other processes.
+        See SharedIndex for details.
+
+        Args:
+            name:   optional name for the shared memory block.
+
+        '''
+        return SharedIndex.create(self._iter_intervals(), name=name)
+
+    def _iter_intervals(self):
+        ''' Yield each indexed interval once, in coordinate order. '''
+        for windows in self.regions.values():
+            prev = None
+            for i in sorted(windows):
+                for gi in windows[i]:
+                    if gi is prev:  # intervals spanning several windows
+                        continue
+                    prev = gi
+                    yield gi
 
     def fetch_by_interval(self, interval):
         '''
@@ -43,9 +165,21 @@ class RegionFinder(object):
             interval:    region in format "chr1:1000-5000"
 
         '''
-        contig, pos = interval.split(':')
-        start, end = pos.split('-')
-        return self.fetch(contig, int(start), int(end))
+        contig, start, end = parse_region(interval)
+        return self.fetch(contig, start + 1, end)
+
+    def fetch_by_intervals(self, intervals):
+        '''
+        Parse a list of regions in bulk and return a list of results
+        for each.
+
+        Args:
+            intervals:  list of regions in format "chr1:1000-5000"
+
+        '''
+        contigs, starts, ends = parse_regions(intervals)
+        return [self.fetch(c, s + 1, e) for c, s, e in
+                zip(contigs.tolist(), starts.tolist(), ends.tolist())]
 
     def fetch(self, contig, start, end):
         '''
@@ -71,6 +205,38 @@ class RegionFinder(object):
             candidates.sort()
         return self._binsearch_regions(candidates, start, end)
 
+    def fetch_records(self, contig, start, end):
+        '''
+        Return the original unmerged intervals (i.e. members of the
+        'regions' property of merged GenomicIntervals) which overlap
+        the given coordinates. This is fastest for merged intervals
+        created from many intervals if the RegionFinder was created
+        with record_index=True.
+
+        Args:
+            contig: contig/chromosome name
+
+            start:  1-based start coordinate of region
+
+            end:    1-based end coordinate of region
+
+        '''
+        records = []
+        for gi in self.fetch(contig, start, end):
+            if len(gi.regions) == 1:
+                records.append(gi.regions[0])
+                continue
+            index = None
+            if self.record_index is not None:
+                index = self.record_index[contig].get(gi.start)
+            if index is None:
+                records.extend(r for r in gi.regions
+                               if start <= r[2] and end > r[1])
+                continue
+            records.extend(gi.regions[i] for i in
+                           index.find(start, end).tolist())
+        return records
+
     def _binsearch_regions(self, regions, start, end):
         '''
             Assumes all regions are on the same chromosome. Return all
@@ -109,3 +275,14 @@ class RegionFinder(object):
             return self._binsearch(regions, l, i - 1, start, end)
         else:
             return i
+
+
+def _window_range(gi, window_size):
+    ''' Return the start coordinates of windows spanned by an interval. '''
+    r_start = int(gi.start / window_size) * window_size
+    r_end = int(gi.end / window_size) * window_size
+    return range(r_start, r_end + window_size, window_size)
+
+
+class IntervalNotFoundError(ValueError):
+    pass
@@ -1,5 +1,9 @@
+import gzip
+import numpy as np
 from .interval_iter import IntervalIter
 
+_MAX_DIGITS = 18  # longer coordinates could overflow int64
+
 
 class RegionIter(IntervalIter):
     '''
@@ -16,21 +20,145 @@ class RegionIter(IntervalIter):
         intervals = self._parse_regions(regions)
         super().__init__(intervals)
 
+    @classmethod
+    def from_file(cls, path):
+        '''
+            Create a RegionIter from a file (optionally gzipped) with
+            one region per line.
+        '''
+        return cls(read_region_file(path))
+
     def _parse_regions(self, regions):
-        return (self._interval_from_string(x) for x in regions)
-
-    def _interval_from_string(self, interval):
-        try:
-            chrom, pos = interval.split(":")
-            pos_split = pos.split("-")
-            if len(pos_split) == 2:
-                start, end = pos_split
-            else:
-                start, end = pos, pos
-            start = int(start.replace(',', '')) - 1  # 0-based, same as BED
-            end = int(end.replace(',', ''))
-            return [chrom, start, end]
-        except ValueError as e:
-            raise RuntimeError(
-                "Invalid --region specified: '{}'".format(interval) + "\n" +
-                str(e))
+        contigs, starts, ends = parse_regions(regions)
+        return [list(x) for x in zip(contigs.tolist(), starts.tolist(),
+                                     ends.tolist())]
+
+
+def parse_regions(regions):
+    '''
+        Parse a list of regions in format 'chr1:1000-2000' (or
+        'chr1:1000' for a single position) in bulk. Rather than failing
+        on the first malformed region, a RegionFormatError listing all
+        malformed regions is raised. Regions are validated using the
+        same rules as parse_region.
+
+        Returns:
+            A tuple of numpy arrays of contigs, 0-based start
+            coordinates and end coordinates.
+    '''
+    regions = [x.strip() for x in regions]
+    n = len(regions)
+    if n and (np.char.count(regions, ':') != 1).any():
+        raise RegionFormatError(_invalid_regions(regions))
+    # contig names and positions alternate as each region has one ':'
+    parts = ':'.join(regions).split(':') if n else []
+    contigs, positions = parts[0::2], parts[1::2]
+    if '' in contigs:
+        raise RegionFormatError(_invalid_regions(regions))
+    # single positions are converted to ranges so that every line has
+    # exactly one '-' if the total count matches the number of regions
+    pos_text = '\n'.join([x if '-' in x else x + '-' + x
+                          for x in positions]).replace(',', '')
+    if not _valid_position_text(pos_text, n):
+        raise RegionFormatError(_invalid_regions(regions))
+    coords = np.fromstring(pos_text.replace('-', ' ').replace('\n', ' '),
+                           dtype=np.int64, sep=' ')
+    starts = coords[0::2] - 1  # 0-based, same as BED
+    ends = coords[1::2]
+    if (starts >= ends).any():
+        raise RegionFormatError(_invalid_regions(regions))
+    return np.array(contigs, dtype=object), starts, ends
+
+
+def _valid_position_text(pos_text, n):
+    '''
+        True if each of the n lines of pos_text, all of which contain at
+        least one '-', consists of two integers separated by a '-',
+        neither longer than _MAX_DIGITS digits.
+    '''
+    if n == 0:
+        return True
+    if pos_text.count('-') != n or pos_text.count('\n') != n - 1:
+        return False
+    if (pos_text[0] == '-' or pos_text[-1] == '-' or '\n-' in pos_text
+            or '-\n' in pos_text):
+        return False
+    digits = pos_text.replace('-', '').replace('\n', '')
+    if not (digits.isascii() and digits.isdigit()):
+        return False
+    return max(map(len, pos_text.replace('\n', '-').split('-'))) <= \
+        _MAX_DIGITS
+
+
+def parse_region(region):
+    '''
+        Parse a single region in format 'chr1:1000-2000' (or 'chr1:1000'
+        for a single position) and return a tuple of contig, 0-based
+        start and end. Use parse_regions for large numbers of regions.
+    '''
+    coords = _region_coords(region.strip())
+    if coords is None:
+        raise RegionFormatError([region])
+    return coords
+
+
+def _region_coords(region):
+    ''' Return (contig, start, end) for region or None if invalid. '''
+    split = region.split(':')
+    if len(split) != 2 or not split[0]:
+        return None
+    contig, pos = split
+    if '-' not in pos:
+        pos = pos + '-' + pos
+    pos = pos.split('-')
+    if len(pos) != 2:
+        return None
+    start, end = (x.replace(',', '') for x in pos)
+    if not (start.isascii() and start.isdigit() and end.isascii() and
+            end.isdigit()):
+        return None
+    if len(start) > _MAX_DIGITS or len(end) > _MAX_DIGITS:
+        return None
+    start = int(start) - 1  # 0-based, same as BED
+    end = int(end)
+    if start >= end:
+        return None
+    return (contig, start, end)
+
+
+def _invalid_regions(regions):
+    ''' Return a list of all malformed regions. '''
+    return [x for x in regions if _region_coords(x) is None]
+
+
+def read_region_file(path):
+    '''
+        Return a list of regions from a file (optionally gzipped) with
+        one region per line, skipping blank lines and lines starting
+        with '#'.
+    '''
+    if path.endswith((".gz", ".bgz")):
+        rfile = gzip.open(path, errors='replace', mode='rt')
+    else:
+        rfile = open(path, 'rt')
+    with rfile:
+        return [x for x in rfile.read().split('\n')
+                if x.strip() and x[0] != '#']
+
+
+class RegionFormatError(RuntimeError, ValueError):
+    '''
+        Raised when regions can not be parsed. All malformed regions
+        are available from the 'invalid_regions' property. This is a
+        RuntimeError as previously raised by RegionIter and a ValueError
+        as previously raised by fetch_by_interval methods.
+    '''
+
+    def __init__(self, invalid_regions, max_shown=10):
+        self.invalid_regions = invalid_regions
+        shown = ", ".join("'{}'".format(x)
+                          for x in invalid_regions[:max_shown])
+        if len(invalid_regions) > max_shown:
+            shown += " and {} more".format(len(invalid_regions) - max_shown)
+        super().__init__("{} invalid region(s) specified: {}".format(
+            len(invalid_regions), shown))
@@ -0,0 +1,329 @@
+import sys
+import json
+import mmap
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from .genomic_interval import GenomicInterval
+from .region_iter import parse_region
+
+_MAGIC = b'RFSHIDX1'
+_HEADER_LEN = len(_MAGIC) + 8  # magic followed by uint64 length of JSON
+_ATTACHED = dict()  # shared memory block names to attached SharedIndexes
+
+
+class SharedIndex(object):
+    '''
+        Read-only index of merged intervals stored as flat arrays in a
+        single buffer - either a multiprocessing.shared_memory block or
+        a memory-mapped file. Worker processes attach to the buffer by
+        name (or path) and query it in place, without unpickling or
+        copying the index, so any number of processes share one copy.
+
+        The unmerged intervals held in the 'regions' property of each
+        GenomicInterval are stored as tab-delimited text and restored
+        when intervals are retrieved. Columns 2 and 3 of these are
+        restored as integers and any other columns as strings.
+
+        Pickling a SharedIndex (e.g. passing it as an argument to a
+        multiprocessing.Pool worker) only pickles the name or path of
+        its buffer - the receiving process re-attaches to it. Each
+        process attaches to a shared memory block once, so that tasks
+        receiving the same index reuse the existing attachment.
+    '''
+
+    __slots__ = ['contigs', 'offsets', 'starts', 'ends', 'idx', 'length',
+                 'record_offsets', 'records', '_contig_index', '_shm',
+                 '_mmap', '_source']
+
+    def __init__(self, buffer, shm=None, mm=None, source=None):
+        '''
+            Use the create, attach, write_file or from_file methods
+            rather than instantiating directly.
+        '''
+        self._shm = shm
+        self._mmap = mm
+        self._source = source
+        header = bytes(buffer[:_HEADER_LEN])
+        if header[:len(_MAGIC)] != _MAGIC:
+            raise SharedIndexError("Buffer does not contain a SharedIndex")
+        json_len = int.from_bytes(header[len(_MAGIC):], 'little')
+        meta = json.loads(bytes(buffer[_HEADER_LEN:_HEADER_LEN + json_len]))
+        self.contigs = meta['contigs']
+        self._contig_index = dict((c, i) for i, c in enumerate(self.contigs))
+        n = meta['n']
+        pos = _data_offset(json_len)
+        arrays = []
+        for size in (len(self.contigs) + 1, n, n, n, n + 1):
+            arr = np.frombuffer(buffer, dtype=np.int64, count=size,
+                                offset=pos)
+            arr.flags.writeable = False
+            arrays.append(arr)
+            pos += size * 8
+        (self.offsets, self.starts, self.ends, self.idx,
+         self.record_offsets) = arrays
+        self.records = np.frombuffer(buffer, dtype=np.uint8,
+                                     count=meta['record_bytes'], offset=pos)
+        self.records.flags.writeable = False
+        self.length = int(self.idx[-1]) if n else 0
+
+    def __len__(self):
+        return self.length
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        # arrays must be released before the shared memory block can be
+        # closed, otherwise SharedMemory.__del__ reports a BufferError
+        if getattr(self, '_source', None) is not None:
+            self.close()
+
+    def __reduce__(self):
+        if self._source is None:
+            raise SharedIndexError("SharedIndex has been closed")
+        kind, location = self._source
+        if kind == 'shm':
+            return (SharedIndex.attach, (location, ))
+        return (SharedIndex.from_file, (location, ))
+
+    @property
+    def name(self):
+        ''' Name of the shared memory block (None for file-backed). '''
+        if self._shm is None:
+            return None
+        return self._shm.name
+
+    @classmethod
+    def create(cls, intervals, name=None):
+        '''
+            Copy intervals into a new shared memory block. The calling
+            process owns the block and should call unlink() once all
+            workers are finished with it.
+
+            Args:
+                intervals:
+                    An iterable of coordinate sorted GenomicInterval
+                    objects such as an IntervalIter or the 'intervals'
+                    of an IntervalSampler.
+
+                name:
+                    Optional name for the shared memory block. A unique
+                    name is generated if not provided.
+        '''
+        meta, arrays = _pack(intervals)
+        size = _data_offset(len(meta)) + sum(x.nbytes for x in arrays)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _write(shm.buf, meta, arrays)
+        return cls(shm.buf, shm=shm, source=('shm', shm.name))
+
+    @classmethod
+    def attach(cls, name):
+        '''
+            Attach read-only to a shared memory block created by the
+            create method, by its name. If this process is already
+            attached to the block the existing SharedIndex is returned.
+        '''
+        index = _ATTACHED.get(name)
+        if index is None:
+            shm = _open_shared_memory(name)
+            index = cls(shm.buf, shm=shm, source=('shm', name))
+            _ATTACHED[name] = index
+        return index
+
+    @classmethod
+    def write_file(cls, intervals, path):
+        '''
+            Write intervals to a file that can be memory-mapped by
+            processes using the from_file method.
+        '''
+        meta, arrays = _pack(intervals)
+        with open(path, 'wb') as fh:
+            fh.write(_MAGIC)
+            fh.write(len(meta).to_bytes(8, 'little'))
+            fh.write(meta)
+            fh.write(bytes(_data_offset(len(meta)) - _HEADER_LEN - len(meta)))
+            for arr in arrays:
+                fh.write(arr.tobytes())
+
+    @classmethod
+    def from_file(cls, path):
+        ''' Memory-map a file written by the write_file method. '''
+        with open(path, 'rb') as fh:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mm, mm=mm, source=('file', path))
+
+    def close(self):
+        '''
+            Release this process' view of the index. The underlying
+            shared memory block remains available to other processes
+            until unlink() is called. If arrays of the index (e.g.
+            'starts') are still referenced elsewhere, the buffer is
+            unmapped once they are garbage collected.
+        '''
+        if self._source is not None and self._source[0] == 'shm' and \
+                _ATTACHED.get(self._source[1]) is self:
+            del _ATTACHED[self._source[1]]
+        self.offsets = self.starts = self.ends = self.idx = None
+        self.record_offsets = self.records = None
+        if self._shm is not None:
+            _close_shared_memory(self._shm)
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # closed when the exported arrays are released
+        self._source = None
+
+    def unlink(self):
+        ''' Close and destroy the underlying shared memory block. '''
+        shm = self._shm
+        self.close()
+        if shm is not None:
+            attached = _ATTACHED.get(shm.name)
+            if attached is not None:
+                attached.close()
+            if sys.version_info < (3, 13):
+                # child processes sharing our resource tracker will have
+                # unregistered the block when attaching to it
+                resource_tracker.register(shm._name, 'shared_memory')
+            shm.unlink()
+
+    def fetch_by_interval(self, interval):
+        '''
+        Args:
+            interval:    region in format "chr1:1000-5000"
+
+        '''
+        contig, start, end = parse_region(interval)
+        return self.fetch(contig, start + 1, end)
+
+    def fetch(self, contig, start, end):
+        '''
+        Return merged intervals overlapping the given coordinates as
+        GenomicInterval objects, as for RegionFinder.fetch.
+
+        Args:
+            contig: contig/chromosome name
+
+            start:  1-based start coordinate of region
+
+            end:    1-based end coordinate of region
+
+        '''
+        i = self._contig_index.get(contig)
+        if i is None:
+            return []
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        first = lo + self.ends[lo:hi].searchsorted(start, side='left')
+        last = lo + self.starts[lo:hi].searchsorted(end, side='left')
+        return [self._interval(j, contig) for j in range(first, last)]
+
+    def interval_by_index(self, i):
+        ''' As for IntervalSampler.interval_by_index '''
+        if i >= self.length:
+            return None
+        return self._interval(self.idx.searchsorted(i, side='right'))
+
+    def position_by_index(self, i):
+        ''' Return 1-based position by index '''
+        if i >= self.length:
+            return (None, None)
+        j = self.idx.searchsorted(i, side='right')
+        offset = i
+        if j > 0:
+            offset = i - self.idx[j - 1]
+        return (self._contig_by_index(j), int(self.starts[j] + offset + 1))
+
+    def _contig_by_index(self, j):
+        return self.contigs[self.offsets.searchsorted(j, side='right') - 1]
+
+    def _interval(self, j, contig=None):
+        if contig is None:
+            contig = self._contig_by_index(j)
+        text = self.records[self.record_offsets[j]:
+                            self.record_offsets[j + 1]].tobytes().decode()
+        regions = []
+        for line in text.split('\n'):
+            cols = line.split('\t')
+            cols[1] = int(cols[1])
+            cols[2] = int(cols[2])
+            regions.append(cols)
+        gi = GenomicInterval([contig, int(self.starts[j]),
+                              int(self.ends[j])])
+        gi.regions = regions
+        return gi
+
+
+def _data_offset(json_len):
+    ''' Offset of array data, padded so that arrays are 8-byte aligned. '''
+    return (_HEADER_LEN + json_len + 7) // 8 * 8
+
+
+def _pack(intervals):
+    contigs = []
+    offsets = []
+    starts = []
+    ends = []
+    records = []
+    record_offsets = [0]
+    for gi in intervals:
+        if not contigs or gi.contig != contigs[-1]:
+            if gi.contig in contigs:
+                raise SharedIndexError("Intervals are not sorted - contig " +
+                                       "'{}' is not contiguous".format(
+                                           gi.contig))
+            contigs.append(gi.contig)
+            offsets.append(len(starts))
+        starts.append(gi.start)
+        ends.append(gi.end)
+        records.append('\n'.join('\t'.join(str(x) for x in r)
+                                 for r in gi.regions).encode())
+        record_offsets.append(record_offsets[-1] + len(records[-1]))
+    offsets.append(len(starts))
+    starts = np.array(starts, dtype=np.int64)
+    ends = np.array(ends, dtype=np.int64)
+    idx = np.cumsum(ends - starts, dtype=np.int64)
+    records = np.frombuffer(b''.join(records), dtype=np.uint8)
+    meta = json.dumps(dict(contigs=contigs, n=len(starts),
+                           record_bytes=len(records))).encode()
+    return meta, [np.array(offsets, dtype=np.int64), starts, ends, idx,
+                  np.array(record_offsets, dtype=np.int64), records]
+
+
+def _write(buffer, meta, arrays):
+    buffer[:len(_MAGIC)] = _MAGIC
+    buffer[len(_MAGIC):_HEADER_LEN] = len(meta).to_bytes(8, 'little')
+    buffer[_HEADER_LEN:_HEADER_LEN + len(meta)] = meta
+    pos = _data_offset(len(meta))
+    for arr in arrays:
+        buffer[pos:pos + arr.nbytes] = arr.tobytes()
+        pos += arr.nbytes
+
+
+def _close_shared_memory(shm):
+    try:
+        shm.close()
+    except BufferError:
+        # Arrays viewing the block are still referenced elsewhere. The
+        # mmap is kept alive by those views and unmapped when they are
+        # released, so only the file descriptor is closed here.
+        shm._buf = None
+        shm._mmap = None
+        shm.close()
+
+
+def _open_shared_memory(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before python 3.13 attaching to a block registers it with the
+    # resource tracker, which unlinks it when the attaching process exits.
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+class SharedIndexError(ValueError):
+    pass
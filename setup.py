@@ -25,6 +25,11 @@ setup(
         verstr),
     license='MIT',
     install_requires=['natsort', 'numpy'],
+    entry_points={
+        'console_scripts': [
+            'region_finder_annotate=region_finder.annotate:main',
+        ],
+    },
     test_requires=['nose2'],
     classifiers=[
         "Programming Language :: Python :: 3",
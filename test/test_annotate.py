@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+import io
+import os
+import gzip
+import random
+import tempfile
+from nose2.tools.such import helper
+from region_finder.annotate import annotate, main, SortOrderError
+from region_finder.bed_parser import BedParser
+from region_finder.region_iter import RegionFormatError
+from region_finder.region_finder import RegionFinder
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+test_bed = os.path.join(dir_path, "test_data", "test_bed.gz")
+bed_searcher = RegionFinder(BedParser(test_bed), record_index=True)
+
+rng = random.Random(3)
+query_intervals = []
+for contig in ('22', '1', '20', '21'):  # not in same order as test_bed
+    starts = sorted(rng.randrange(50000000) for _ in range(300))
+    query_intervals.extend((contig, s, s + rng.randrange(1, 2000))
+                           for s in starts)
+
+
+def _expected_columns(contig, start, end):
+    records = bed_searcher.fetch_records(contig, start + 1, end)
+    names = []
+    for r in records:
+        if r[3] not in names:
+            names.append(r[3])
+    return [str(int(len(records) > 0)), str(len(records)),
+            ",".join(names) or "."]
+
+
+def _write_sorted_target(tmpdir):
+    ''' test_bed.gz is not coordinate sorted - write a sorted copy. '''
+    with gzip.open(test_bed, 'rt') as fh:
+        rows = [line.split("\t") for line in fh]
+    rows.sort(key=lambda x: (x[0], int(x[1])))
+    path = os.path.join(tmpdir, "target.bed.gz")
+    with gzip.open(path, 'wt') as fh:
+        fh.write("".join("\t".join(x) for x in rows))
+    return path
+
+
+def _write_query(tmpdir, fmt):
+    path = os.path.join(tmpdir, "query." + fmt)
+    with open(path, 'wt') as fh:
+        if fmt == 'vcf':
+            fh.write("##fileformat=VCFv4.2\n")
+            fh.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\t" +
+                     "FORMAT\tsample\n")
+        else:
+            fh.write("# header line\n")
+        for contig, start, end in query_intervals:
+            if fmt == 'bed':
+                fh.write("{}\t{}\t{}\tq\n".format(contig, start, end))
+            elif fmt == 'regions':
+                fh.write("{}:{}-{}\n".format(contig, start + 1, end))
+            else:
+                fh.write("{}\t{}\t.\t{}\tA\t.\t.\tDP=5\tGT\t0/1\n".format(
+                    contig, start + 1, "N" * (end - start)))
+    return path
+
+
+def _vcf_annotations(line):
+    s = line.split("\t")
+    helper.assertEqual(len(s), 10)
+    info = dict(x.split("=") for x in s[7].split(";"))
+    helper.assertEqual(info.pop('DP'), '5')
+    return [info['OVERLAP'], info['N_OVERLAPS'],
+            info.get('OVERLAP_NAMES', '.')]
+
+
+def _check_output(output, n_header, vcf=False):
+    lines = output.split("\n")
+    helper.assertEqual(lines[-1], "")
+    lines = lines[n_header:-1]
+    helper.assertEqual(len(lines), len(query_intervals))
+    n_hits = 0
+    for line, interval in zip(lines, query_intervals):
+        expected = _expected_columns(*interval)
+        if vcf:
+            helper.assertEqual(_vcf_annotations(line), expected)
+        else:
+            helper.assertEqual(line.split("\t")[-3:], expected)
+        n_hits += expected[0] == '1'
+    assert n_hits > 0
+
+
+def test_annotate_formats():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        target = _write_sorted_target(tmpdir)
+        for fmt in ('bed', 'regions', 'vcf'):
+            query = _write_query(tmpdir, fmt)
+            output = io.StringIO()
+            annotate(query, target, output=output, query_format=fmt)
+            n_header = 5 if fmt == 'vcf' else 1
+            _check_output(output.getvalue(), n_header, vcf=fmt == 'vcf')
+            if fmt == 'vcf':
+                header = output.getvalue().split("\n")[:n_header]
+                helper.assertEqual(
+                    [x.split(",")[0] for x in header[1:4]],
+                    ['##INFO=<ID=OVERLAP', '##INFO=<ID=N_OVERLAPS',
+                     '##INFO=<ID=OVERLAP_NAMES'])
+                helper.assertEqual(header[4].split("\t")[-2:],
+                                   ['FORMAT', 'sample'])
+
+
+def test_annotate_parallel():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        target = _write_sorted_target(tmpdir)
+        query = _write_query(tmpdir, 'bed')
+        serial = io.StringIO()
+        annotate(query, target, output=serial)
+        _check_output(serial.getvalue(), 1)
+        out_path = os.path.join(tmpdir, "out.bed")
+        main([query, target, '-o', out_path, '-p', '2'])
+        with open(out_path, 'rt') as fh:
+            helper.assertEqual(fh.read(), serial.getvalue())
+        # gzipped query is decompressed once rather than per contig
+        with open(query, 'rb') as fh, \
+                gzip.open(query + '.gz', 'wb') as gz:
+            gz.write(fh.read())
+        main([query + '.gz', target, '-o', out_path, '-p', '2'])
+        with open(out_path, 'rt') as fh:
+            helper.assertEqual(fh.read(), serial.getvalue())
+
+
+def test_undecodable_target():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        target = os.path.join(tmpdir, "target.bed")
+        with open(target, 'wb') as fh:
+            fh.write(b"20\t1000\t2000\tcaf\xe9\n20\t1500\t2500\tb\n")
+        query = os.path.join(tmpdir, "query.bed")
+        with open(query, 'wt') as fh:
+            fh.write("20\t1800\t1900\n")
+        output = io.StringIO()
+        annotate(query, target, output=output)
+        helper.assertEqual(output.getvalue().split("\t")[-2:],
+                           ['2', 'caf\ufffd,b\n'])
+
+
+def test_stdin_with_processes():
+    helper.assertRaises(SystemExit, main, ['-', test_bed, '-p', '2'])
+
+
+def test_invalid_region():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        query = os.path.join(tmpdir, "query.txt")
+        with open(query, 'wt') as fh:
+            fh.write("20:1,000-2,000\n20:3000\n20:5000-4000\n")
+        helper.assertRaises(RegionFormatError, annotate, query, test_bed,
+                            io.StringIO(), query_format='regions')
+        with open(query, 'wt') as fh:
+            fh.write("20:1,000-2,000\n20:3000\n")
+        output = io.StringIO()
+        annotate(query, _write_sorted_target(tmpdir), output=output,
+                 query_format='regions')
+        helper.assertEqual(
+            [x.split("\t")[-3:] for x in output.getvalue().split("\n")[:-1]],
+            [_expected_columns('20', 999, 2000),
+             _expected_columns('20', 2999, 3000)])
+
+
+def test_unsorted_query():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        target = _write_sorted_target(tmpdir)
+        query = os.path.join(tmpdir, "query.bed")
+        with open(query, 'wt') as fh:
+            fh.write("20\t1000\t2000\n20\t500\t600\n")
+        helper.assertRaises(SortOrderError, annotate, query, target,
+                            io.StringIO())
+        with open(query, 'wt') as fh:
+            fh.write("20\t70000000\t70000001\n")
+        helper.assertRaises(SortOrderError, annotate, query, test_bed,
+                            io.StringIO())
+        with open(query, 'wt') as fh:
+            fh.write("20\t1000\t2000\n21\t500\t600\n20\t3000\t4000\n")
+        helper.assertRaises(SortOrderError, annotate, query, target,
+                            io.StringIO(), processes=2)
+
+
+if __name__ == '__main__':
+    import nose2
+    nose2.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import random
+import numpy as np
+from nose2.tools.such import helper
+from region_finder.bitmap_index import BitmapIndex
+from region_finder.interval_iter import IntervalIter
+
+rng = random.Random(7)
+test_regions = [["chr1", 3, 10], ["chr1", 10, 12], ["chr1", 100, 200],
+                ["chr1", 150, 250], ["chr2", 200, 300]]
+for _ in range(10):
+    start = rng.randrange(5000)
+    test_regions.append(["chr3", start, start + rng.randrange(1, 20)])
+intvl_iter = IntervalIter(test_regions)
+covered = set()
+for contig, start, end in test_regions:
+    covered.update((contig, x + 1) for x in range(start, end))
+indexes = [BitmapIndex(intvl_iter), BitmapIndex(intvl_iter, compress=True)]
+
+
+def test_run_length_compression():
+    helper.assertEqual(sorted(indexes[0].bitmaps), ['chr1', 'chr2', 'chr3'])
+    helper.assertEqual(sorted(indexes[1].runs), ['chr2', 'chr3'])
+
+
+def test_packed_bitmap():
+    covered_chr1 = np.zeros(250, dtype=bool)
+    for contig, start, end in test_regions:
+        if contig == 'chr1':
+            covered_chr1[start:end] = True
+    helper.assertEqual(indexes[0].bitmaps['chr1'].tolist(),
+                       np.packbits(covered_chr1).tolist())
+
+
+def test_contains():
+    for idx in indexes:
+        for contig in ('chr1', 'chr2', 'chr3', 'chrX'):
+            for pos in range(-1, 5100):
+                helper.assertEqual(idx.contains(contig, pos),
+                                   (contig, pos) in covered)
+
+
+def test_contains_positions():
+    positions = np.arange(-1, 5100)
+    for idx in indexes:
+        for contig in ('chr1', 'chr2', 'chr3', 'chrX'):
+            expected = [(contig, x) in covered for x in positions]
+            helper.assertEqual(
+                idx.contains_positions(contig, positions).tolist(), expected)
+
+
+def test_covered_bases():
+    for _ in range(500):
+        contig = rng.choice(['chr1', 'chr2', 'chr3'])
+        start = rng.randrange(-5, 5100)
+        end = start + rng.randrange(-2, 400)
+        expected = sum((contig, x) in covered for x in range(start, end + 1))
+        for idx in indexes:
+            helper.assertEqual(idx.covered_bases(contig, start, end),
+                               expected)
+
+
+if __name__ == '__main__':
+    import nose2
+    nose2.main()
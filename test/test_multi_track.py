@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import os
+import random
+from nose2.tools.such import helper
+from region_finder.bed_parser import BedParser
+from region_finder.interval_iter import IntervalIter
+from region_finder.multi_track import MultiTrackFinder
+from region_finder.region_finder import RegionFinder
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+test_bed = os.path.join(dir_path, "test_data", "test_bed.gz")
+bed_intvls = BedParser(test_bed)
+alu_regions = [x for gi in bed_intvls.intervals for x in gi.regions
+               if x[3].startswith('Alu')]
+long_regions = [['20', 0, 20000000], ['21', 47870000, 47875000],
+                ['21', 9000000, 9500000]]
+tracks = [test_bed, IntervalIter(alu_regions), IntervalIter(long_regions)]
+names = ['test_bed.gz', 'track_1', 'track_2']
+finders = [RegionFinder(bed_intvls)] + [RegionFinder(x) for x in tracks[1:]]
+multi_finder = MultiTrackFinder(tracks)
+
+rng = random.Random(11)
+queries = [('20', 8388366, 8388685), ('21', 47870810, 47874852),
+           ('22', 1, 10), ('X', 1, 1000)]
+for _ in range(200):
+    contig = rng.choice(['20', '21', '22'])
+    start = rng.randrange(1, 50000000)
+    queries.append((contig, start, start + rng.randrange(0, 20000)))
+
+
+def _expected(query):
+    expected = dict()
+    for name, finder in zip(names, finders):
+        hits = [str(x) for x in finder.fetch(*query)]
+        if hits:
+            expected[name] = hits
+    return expected
+
+
+def _as_strings(result):
+    return dict((k, [str(x) for x in v]) for k, v in result.items())
+
+
+def test_fetch():
+    helper.assertEqual(multi_finder.tracks, names)
+    n_multi_track_hits = 0
+    for q in queries:
+        expected = _expected(q)
+        helper.assertEqual(_as_strings(multi_finder.fetch(*q)), expected)
+        if len(expected) > 1:
+            n_multi_track_hits += 1
+    assert n_multi_track_hits > 0
+
+
+def test_fetch_many():
+    helper.assertEqual(
+        [_as_strings(x) for x in multi_finder.fetch_many(queries)],
+        [_expected(q) for q in queries])
+
+
+def test_fetch_by_intervals():
+    regions = ['{}:{}-{}'.format(*q) for q in queries[:20]]
+    helper.assertEqual(
+        [_as_strings(x) for x in multi_finder.fetch_by_intervals(regions)],
+        [_as_strings(multi_finder.fetch_by_interval(x)) for x in regions])
+
+
+def test_track_names():
+    helper.assertRaises(ValueError, MultiTrackFinder, tracks[1:], ['a'])
+    helper.assertRaises(ValueError, MultiTrackFinder, tracks[1:], ['a', 'a'])
+    finder = MultiTrackFinder(tracks[1:], names=['alu', 'long'])
+    helper.assertEqual(list(finder.fetch('21', 47871100, 47871200)),
+                       ['alu', 'long'])
+
+
+if __name__ == '__main__':
+    import nose2
+    nose2.main()
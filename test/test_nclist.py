@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import random
+import numpy as np
+from nose2.tools.such import helper
+from region_finder.nclist import NCList
+
+rng = random.Random(5)
+starts = []
+ends = []
+for _ in range(2000):
+    s = rng.randrange(0, 1000000)
+    starts.append(s)
+    ends.append(s + rng.randrange(1, 5000))
+# long intervals containing many others
+for s, e in [(0, 1000000), (1000, 900000), (500000, 500010)]:
+    starts.append(s)
+    ends.append(e)
+nclist = NCList(starts, ends)
+
+
+def _brute_force(start, end):
+    return [i for i in range(len(starts))
+            if start <= ends[i] and end > starts[i]]
+
+
+def test_find():
+    helper.assertEqual(len(nclist), len(starts))
+    for _ in range(200):
+        start = rng.randrange(1, 1010000)
+        end = start + rng.randrange(0, 10000)
+        helper.assertEqual(nclist.find(start, end).tolist(),
+                           _brute_force(start, end))
+    helper.assertEqual(nclist.find(2000000, 2000100).tolist(), [])
+    helper.assertEqual(NCList([], []).find(1, 10).tolist(), [])
+
+
+def test_records_examined():
+    ''' Only overlapping entries should be examined. '''
+    for _ in range(50):
+        start = rng.randrange(1, 1000000)
+        end = start + rng.randrange(0, 1000)
+        ranges = list(nclist.search_ranges(start, end))
+        n_hits = len(_brute_force(start, end))
+        # the long intervals overlap every query but must not cause the
+        # intervals they contain to be scanned
+        assert n_hits >= 2
+        helper.assertEqual(sum(hi - lo for lo, hi in ranges), n_hits)
+
+
+def test_nested_identical():
+    nested = NCList(np.zeros(5, dtype=np.int64), np.full(5, 100))
+    helper.assertEqual(nested.find(50, 60).tolist(), [0, 1, 2, 3, 4])
+    helper.assertEqual(nested.find(101, 200).tolist(), [])
+
+
+if __name__ == '__main__':
+    import nose2
+    nose2.main()
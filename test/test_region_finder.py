@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 import os
 import gzip
+import random
+from operator import itemgetter
+from natsort import natsorted
 from nose2.tools.such import helper
 from region_finder.bed_parser import BedParser, BedFormatError
-from region_finder.region_finder import RegionFinder
+from region_finder.interval_iter import IntervalIter, merge_sorted_regions
+from region_finder.region_finder import RegionFinder, IntervalNotFoundError
 from region_finder.region_iter import RegionIter
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
@@ -79,6 +83,126 @@ def test_no_duplicate_regions():
     assert got_one
 
 
+def test_merge_matches_sorted_merge():
+    with gzip.open(test_bed, 'rt') as fh:
+        rows = [[x[0], int(x[1]), int(x[2])] + x[3:] for x in
+                (line.rstrip().split("\t") for line in fh)]
+    expected = merge_sorted_regions(natsorted(rows,
+                                              key=itemgetter(0, 1, 2)))
+    helper.assertEqual([str(x) for x in bed_intvls.intervals],
+                       [str(x) for x in expected])
+    helper.assertEqual([x.regions for x in bed_intvls.intervals],
+                       [x.regions for x in expected])
+
+
+def test_merge_unsorted():
+    regions = ["chr2:200-300", "chr10:5-10", "chr1:1000-2000", "chr1:100-200",
+               "chr1:150-250", "chr10:1-6"]
+    helper.assertEqual([str(x) for x in RegionIter(regions)],
+                       ['chr1:100-250', 'chr1:1000-2000', 'chr2:200-300',
+                        'chr10:1-10'])
+
+
+def _indexed_regions(searcher):
+    # contig order may differ between updated and rebuilt indexes
+    return sorted(((str(x), x.regions) for x in searcher._iter_intervals()),
+                  key=lambda x: x[0])
+
+
+def test_add_and_remove_intervals():
+    rng = random.Random(42)
+    intervals = []
+    searcher = RegionFinder(IntervalIter([]), window_size=50)
+    for _ in range(300):
+        if intervals and rng.random() < 0.3:
+            interval = intervals.pop(rng.randrange(len(intervals)))
+            searcher.remove_interval(interval)
+        else:
+            start = rng.randrange(1000)
+            interval = [rng.choice(['chr1', 'chr2']), start,
+                        start + rng.randrange(1, 80)]
+            intervals.append(interval)
+            searcher.add_interval(interval)
+        rebuilt = RegionFinder(IntervalIter(intervals), window_size=50)
+        helper.assertEqual(_indexed_regions(searcher),
+                           _indexed_regions(rebuilt))
+    for _ in range(50):
+        start = rng.randrange(1000)
+        query = ('chr1', start, start + rng.randrange(1, 100))
+        helper.assertEqual([str(x) for x in searcher.fetch(*query)],
+                           [str(x) for x in rebuilt.fetch(*query)])
+
+
+def test_remove_split_interval():
+    searcher = RegionFinder(IntervalIter([['chr1', 100, 200],
+                                          ['chr1', 150, 300],
+                                          ['chr1', 250, 400]]))
+    replacements = searcher.remove_interval(['chr1', 150, 300])
+    helper.assertEqual([str(x) for x in replacements],
+                       ['chr1:101-200', 'chr1:251-400'])
+    helper.assertEqual([str(x) for x in searcher.fetch('chr1', 1, 1000)],
+                       ['chr1:101-200', 'chr1:251-400'])
+    helper.assertRaises(IntervalNotFoundError, searcher.remove_interval,
+                        ['chr1', 150, 300])
+
+
+def test_remove_spanning_interval():
+    records = [['chr1', 0, 300000]] + [['chr1', i * 10, i * 10 + 5]
+                                       for i in range(30000)]
+    searcher = RegionFinder(IntervalIter(records), window_size=1000,
+                            record_index=True)
+    replacements = searcher.remove_interval(['chr1', 0, 300000])
+    rebuilt = RegionFinder(IntervalIter(records[1:]), window_size=1000)
+    helper.assertEqual(len(replacements), 30000)
+    helper.assertEqual(_indexed_regions(searcher), _indexed_regions(rebuilt))
+    helper.assertEqual(searcher.fetch_records('chr1', 1, 12),
+                       [['chr1', 0, 5], ['chr1', 10, 15]])
+
+
+def _overlapping_records(records, contig, start, end):
+    return [r for r in records
+            if r[0] == contig and start <= r[2] and end > r[1]]
+
+
+def test_fetch_records():
+    rng = random.Random(5)
+    records = [['1', 0, 100000]]
+    for _ in range(2000):
+        start = rng.randrange(100000)
+        records.append(['1', start, start + rng.randrange(1, 50)])
+    intvl_iter = IntervalIter(records)
+    helper.assertEqual(len(intvl_iter.intervals), 1)
+    indexed = RegionFinder(intvl_iter.intervals, window_size=1000,
+                           record_index=True)
+    unindexed = RegionFinder(intvl_iter.intervals, window_size=1000)
+    for _ in range(200):
+        start = rng.randrange(100100)
+        query = ('1', start, start + rng.randrange(0, 100))
+        expected = _overlapping_records(intvl_iter.intervals[0].regions,
+                                        *query)
+        helper.assertEqual(indexed.fetch_records(*query), expected)
+        helper.assertEqual(unindexed.fetch_records(*query), expected)
+        # the long record must not cause the records it contains to be
+        # examined - only overlapping records should be
+        ranges = indexed.record_index['1'][0].search_ranges(*query[1:])
+        helper.assertEqual(sum(hi - lo for lo, hi in ranges), len(expected))
+    indexed.remove_interval(['1', 0, 100000])
+    records = sorted(records[1:])
+    for _ in range(200):
+        start = rng.randrange(100100)
+        query = ('1', start, start + rng.randrange(0, 100))
+        helper.assertEqual(indexed.fetch_records(*query),
+                           _overlapping_records(records, *query))
+
+
+def test_fetch_records_bed():
+    indexed = RegionFinder(bed_intvls.intervals, record_index=True)
+    for query, answer in _regions_to_lines.items():
+        contig, pos = query.split(':')
+        start, end = (int(x) for x in pos.split('-'))
+        helper.assertEqual(indexed.fetch_records(contig, start, end), answer)
+
+
 if __name__ == '__main__':
     import nose2
     nose2.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+import os
+import gzip
+import tempfile
+from nose2.tools.such import helper
+from region_finder.bed_parser import BedParser
+from region_finder.interval_iter import IntervalIter
+from region_finder.region_finder import RegionFinder
+from region_finder.region_iter import RegionIter, RegionFormatError
+from region_finder.region_iter import parse_region, parse_regions
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+test_bed = os.path.join(dir_path, "test_data", "test_bed.gz")
+
+valid_regions = ['chr1:1,000-2,000', 'chr2:5', 'HLA-A:3-4', 'chr1:1500-2500']
+invalid_regions = ['bad', 'chr1:5-3', 'chr1:a-b', 'chr1:1-2-3', 'chr1:-5',
+                   'chr1:5-', 'chr1:1:2', ':5-6', 'chr1:1.5-3']
+
+
+def test_parse_regions():
+    contigs, starts, ends = parse_regions(valid_regions)
+    helper.assertEqual(contigs.tolist(), ['chr1', 'chr2', 'HLA-A', 'chr1'])
+    helper.assertEqual(starts.tolist(), [999, 4, 2, 1499])
+    helper.assertEqual(ends.tolist(), [2000, 5, 4, 2500])
+
+
+def test_parse_bed_regions():
+    with gzip.open(test_bed, 'rt') as fh:
+        rows = [line.split()[:3] for line in fh]
+    regions = ["{}:{}-{}".format(x[0], int(x[1]) + 1, x[2]) for x in rows]
+    helper.assertEqual(
+        [list(x) for x in zip(*(a.tolist() for a in parse_regions(regions)))],
+        [[x[0], int(x[1]), int(x[2])] for x in rows])
+
+
+def test_parse_region():
+    helper.assertEqual(parse_region('chr1:1,000-2,000'), ('chr1', 999, 2000))
+    helper.assertEqual(parse_region(' HLA-A:5 '), ('HLA-A', 4, 5))
+    for region in invalid_regions:
+        helper.assertRaises(RegionFormatError, parse_region, region)
+
+
+def test_validators_agree():
+    edge_cases = ['chr1:,5-6', 'chr1:5,-6', 'chr1:,', 'chr1:5-,',
+                  'chr1:1\n2-3', 'chr1:1 2-3', 'chr1:\u0665-9', 'chr1:1-1']
+    for region in edge_cases:
+        try:
+            alone = parse_regions([region])
+        except RegionFormatError:
+            alone = None
+        try:
+            with_invalid = parse_regions([region, 'bad'])
+        except RegionFormatError as e:
+            with_invalid = e.invalid_regions
+        helper.assertEqual(with_invalid == ['bad'], alone is not None)
+
+
+def test_coordinate_overflow():
+    ends = parse_regions(['chr1:1-999999999999999999'])[2]
+    helper.assertEqual(ends.tolist(), [999999999999999999])
+    for region in ('chr1:1-99999999999999999999', 'chr1:1-9999999999999999999',
+                   'chr1:99999999999999999999'):
+        helper.assertRaises(RegionFormatError, parse_regions, [region])
+        helper.assertRaises(RegionFormatError, parse_region, region)
+
+
+def test_all_invalid_regions_reported():
+    try:
+        parse_regions(invalid_regions[:4] + valid_regions +
+                      invalid_regions[4:])
+    except RegionFormatError as e:
+        helper.assertEqual(sorted(e.invalid_regions), sorted(invalid_regions))
+    else:
+        raise AssertionError("RegionFormatError not raised")
+    # a missing ':' must not be offset by an extra ':' in another region
+    for regions in (['chrA', '1:2:3'], ['1:2:3', 'chrA'],
+                    ['chr1:1-2', 'chrA', 'chr1:5:1-3']):
+        try:
+            parse_regions(regions)
+        except RegionFormatError as e:
+            helper.assertEqual(e.invalid_regions,
+                               [x for x in regions if x.count(':') != 1])
+        else:
+            raise AssertionError("RegionFormatError not raised")
+        helper.assertRaises(RegionFormatError, RegionIter, regions)
+    helper.assertRaises(RuntimeError, RegionIter, ['chr1:5-6', 'chr1'])
+    helper.assertRaises(ValueError, RegionIter, ['chr1:5-6', 'chr1'])
+
+
+def test_region_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "regions.txt")
+        with open(path, 'wt') as fh:
+            fh.write("# comment\n" + "\n".join(valid_regions) + "\n\n")
+        reg_iter = RegionIter.from_file(path)
+    helper.assertEqual([str(x) for x in reg_iter],
+                       ['HLA-A:3-4', 'chr1:1000-2500', 'chr2:5-5'])
+
+
+def test_fetch_by_intervals():
+    bed_searcher = RegionFinder(BedParser(test_bed))
+    queries = ['20:8388366-8388685', '21:47870810-47874852', '22:1-1',
+               'X:1-1000']
+    helper.assertEqual(
+        [[str(x) for x in hits]
+         for hits in bed_searcher.fetch_by_intervals(queries)],
+        [[str(x) for x in bed_searcher.fetch_by_interval(q)]
+         for q in queries])
+
+
+def test_parsed_regions_merge():
+    contigs, starts, ends = parse_regions(valid_regions)
+    intvl_iter = IntervalIter(zip(contigs, starts.tolist(), ends.tolist()))
+    helper.assertEqual([str(x) for x in intvl_iter],
+                       ['HLA-A:3-4', 'chr1:1000-2500', 'chr2:5-5'])
+
+
+if __name__ == '__main__':
+    import nose2
+    nose2.main()
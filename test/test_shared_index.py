@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import os
+import gc
+import sys
+import pickle
+import tempfile
+from multiprocessing import Pool
+from nose2.tools.such import helper
+from region_finder.bed_parser import BedParser
+from region_finder.interval_iter import IntervalIter
+from region_finder.interval_sampler import IntervalSampler
+from region_finder.region_finder import RegionFinder
+from region_finder import shared_index
+from region_finder.shared_index import SharedIndex, SharedIndexError
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+test_bed = os.path.join(dir_path, "test_data", "test_bed.gz")
+bed_searcher = RegionFinder(BedParser(test_bed))
+
+queries = [('20', 8388366, 8388685), ('21_gl000210_random', 27468, 27682),
+           ('22', 51244457, 51244541), ('21', 47870810, 47874852),
+           ('20', 1, 10), ('X', 1, 1000000)]
+
+test_regions = [["chr1", 100, 200], ["chr1", 1000, 2000], ["chr2", 200, 300]]
+
+
+def _fetch_strings(searcher, query):
+    return [(str(x), x.regions) for x in searcher.fetch(*query)]
+
+
+def _worker_fetch(args):
+    shared_idx, query = args
+    return _fetch_strings(shared_idx, query)
+
+
+def test_shared_fetch():
+    shared_idx = bed_searcher.to_shared_index()
+    try:
+        attached = SharedIndex.attach(shared_idx.name)
+        for q in queries:
+            helper.assertEqual(_fetch_strings(attached, q),
+                               _fetch_strings(bed_searcher, q))
+        helper.assertEqual(attached.starts.flags.writeable, False)
+        attached.close()
+    finally:
+        shared_idx.unlink()
+
+
+def test_shared_fetch_in_workers():
+    shared_idx = bed_searcher.to_shared_index()
+    try:
+        helper.assertEqual(len(pickle.dumps(shared_idx)) < 200, True)
+        with Pool(2) as pool:
+            results = pool.map(_worker_fetch,
+                               [(shared_idx, q) for q in queries])
+        helper.assertEqual(
+            results, [_fetch_strings(bed_searcher, q) for q in queries])
+    finally:
+        shared_idx.unlink()
+
+
+def test_attachments_released():
+    shared_idx = bed_searcher.to_shared_index()
+    unraisable = []
+    hook = sys.unraisablehook
+    sys.unraisablehook = unraisable.append
+    try:
+        attached = SharedIndex.attach(shared_idx.name)
+        helper.assertEqual(
+            pickle.loads(pickle.dumps(shared_idx)) is attached, True)
+        # arrays still referenced do not prevent closing
+        starts = attached.starts
+        attached.close()
+        helper.assertEqual(int(starts[0]), int(shared_idx.starts[0]))
+        del starts
+        # indexes garbage collected without being closed
+        for _ in range(5):
+            attached = SharedIndex.attach(shared_idx.name)
+            del shared_index._ATTACHED[shared_idx.name]
+            del attached
+            gc.collect()
+        helper.assertEqual(unraisable, [])
+    finally:
+        sys.unraisablehook = hook
+        shared_idx.unlink()
+
+
+def test_shared_sampler_index():
+    sampler = IntervalSampler(IntervalIter(test_regions))
+    with sampler.to_shared_index() as shared_idx:
+        helper.assertEqual(list(shared_idx.idx), list(sampler.idx))
+        helper.assertEqual(len(shared_idx), len(sampler))
+        for i in (0, 1, 99, 100, 1100, 1199, 1200):
+            helper.assertEqual(shared_idx.position_by_index(i),
+                               sampler.position_by_index(i))
+            helper.assertEqual(shared_idx.interval_by_index(i),
+                               sampler.interval_by_index(i))
+        shared_idx.unlink()
+
+
+def test_file_backed_index():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "index.rfi")
+        SharedIndex.write_file(bed_searcher._iter_intervals(), path)
+        with SharedIndex.from_file(path) as shared_idx:
+            for q in queries:
+                helper.assertEqual(_fetch_strings(shared_idx, q),
+                                   _fetch_strings(bed_searcher, q))
+            with pickle.loads(pickle.dumps(shared_idx)) as unpickled:
+                helper.assertEqual(unpickled.contigs, shared_idx.contigs)
+
+
+def test_unsorted_intervals_error():
+    intervals = IntervalIter(test_regions).intervals
+    helper.assertRaises(SharedIndexError, SharedIndex.create,
+                        intervals + intervals[:1])
+
+
+if __name__ == '__main__':
+    import nose2
+    nose2.main()